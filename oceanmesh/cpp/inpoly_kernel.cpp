@@ -0,0 +1,112 @@
+#include <pybind11/numpy.h>
+#include <pybind11/pybind11.h>
+
+#include <cmath>
+#include <cstdint>
+#include <vector>
+
+namespace py = pybind11;
+
+using DoubleArray =
+    py::array_t<double, py::array::c_style | py::array::forcecast>;
+using IndexArray =
+    py::array_t<std::int64_t, py::array::c_style | py::array::forcecast>;
+
+// first jpos in [ilow, iupp) with vert[jpos, 1] >= yval (or > yval if
+// `right`), where vert[:, 1] is sorted -- i.e. numpy.searchsorted.
+static py::ssize_t search_y(const double *__restrict vert, py::ssize_t ilow,
+                            py::ssize_t iupp, double yval, bool right) {
+  while (ilow < iupp) {
+    const py::ssize_t imid = ilow + (iupp - ilow) / 2;
+    const double ymid = vert[2 * imid + 1];
+    if (ymid < yval || (right && ymid == yval)) {
+      ilow = imid + 1;
+    } else {
+      iupp = imid;
+    }
+  }
+  return ilow;
+}
+
+// Crossing-number kernel -- a C++ port of `_inpoly` in inpoly.py.
+// VERT is sorted by y-value via IVEC, EDAT is the M-by-8 edge table
+// built by `_edge_table`. STAT and BNDS are returned in the unsorted
+// order.
+py::tuple inpoly(DoubleArray vert_, IndexArray ivec_, DoubleArray edat_,
+                 double ftol, double lbar) {
+  const py::ssize_t nvrt = vert_.shape(0);
+  const py::ssize_t nedg = edat_.shape(0);
+
+  const double *__restrict vert = vert_.data();
+  const std::int64_t *__restrict ivec = ivec_.data();
+  const double *__restrict edat = edat_.data();
+
+  py::array_t<bool> stat_(nvrt);
+  py::array_t<bool> bnds_(nvrt);
+
+  bool *__restrict stat = stat_.mutable_data();
+  bool *__restrict bnds = bnds_.mutable_data();
+
+  {
+    py::gil_scoped_release release;
+
+    const double feps = ftol * (lbar * lbar);
+    const double veps = ftol * (lbar * 1.0);
+
+    std::vector<unsigned char> stmp(nvrt, 0);
+    std::vector<unsigned char> btmp(nvrt, 0);
+
+    // ---------------------------------- loop over polygon edges
+    for (py::ssize_t epos = 0; epos < nedg; ++epos) {
+      const double *__restrict edge = edat + 8 * epos;
+
+      const double xone = edge[0];
+      const double yone = edge[2];
+      const double ytwo = edge[3];
+
+      const double xmin = edge[4];
+      const double xmax = edge[5] + veps;
+
+      const double xdel = edge[6];
+      const double ydel = edge[7];
+
+      const py::ssize_t ione = search_y(vert, 0, nvrt, yone - veps, false);
+      const py::ssize_t itwo = search_y(vert, ione, nvrt, ytwo + veps, true);
+
+      // ------------------------------ calc. edge-intersection
+      for (py::ssize_t jpos = ione; jpos < itwo; ++jpos) {
+        const double xpos = vert[2 * jpos + 0];
+        const double ypos = vert[2 * jpos + 1];
+
+        // -------------------------- compute crossing number
+        const double mul1 = ydel * (xpos - xone);
+        const double mul2 = xdel * (ypos - yone);
+
+        // BNDS -- approx. on edge, incl. exact matches about ONE/TWO
+        const bool inbox = (xpos >= xmin) & (xpos <= xmax);
+        const bool onedge = inbox & (std::abs(mul2 - mul1) <= feps);
+
+        // advance crossing number -- left of bbox, or strict crossing;
+        // BNDS points are forced "inside" when unpacking below
+        bool cross = (ypos >= yone) & (ypos < ytwo);
+        cross &= (xpos < xmin) | (inbox & (mul1 < mul2));
+
+        stmp[jpos] ^= cross;
+        btmp[jpos] |= onedge;
+      }
+    }
+
+    // ---------------------------------- unpack array reindexing
+    for (py::ssize_t jpos = 0; jpos < nvrt; ++jpos) {
+      stat[ivec[jpos]] = stmp[jpos] | btmp[jpos];
+      bnds[ivec[jpos]] = btmp[jpos];
+    }
+  }
+
+  return py::make_tuple(stat_, bnds_);
+}
+
+PYBIND11_MODULE(inpoly_kernel, m) {
+  m.def("inpoly", &inpoly, py::arg("vert"), py::arg("ivec"), py::arg("edat"),
+        py::arg("ftol"), py::arg("lbar"));
+}
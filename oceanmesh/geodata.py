@@ -96,9 +96,11 @@ def _densify(poly, maxdiff, bbox, radius=0):
 
 
 def _poly_area(x, y):
-    """Calculates area of a polygon"""
+    """Calculates area of a polygon, or of each row when `x` and `y`
+    are 2D arrays of polygons with the same number of vertices"""
     return 0.5 * numpy.abs(
-        numpy.dot(x, numpy.roll(y, 1)) - numpy.dot(y, numpy.roll(x, 1))
+        numpy.einsum("...i,...i->...", x, numpy.roll(y, 1, axis=-1))
+        - numpy.einsum("...i,...i->...", y, numpy.roll(x, 1, axis=-1))
     )
 
 
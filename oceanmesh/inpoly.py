@@ -1,8 +1,26 @@
 import numpy as np
-from numba import jit
+from numba import get_num_threads, jit, prange
 
+try:
+    # C++ port of _INPOLY, see cpp/inpoly_kernel.cpp
+    from .cpp.inpoly_kernel import inpoly as _inpoly_cpp
+except ImportError:
+    _inpoly_cpp = None
 
-def inpoly(vert, node, edge=None, ftol=5.0e-14):
+# Largest number of vertex-edge pairs tested all at once by the
+# broadcast kernel. Once compiled, the sorted kernel is as fast
+# or faster at every size, so this only covers problems small
+# enough that skipping the JIT warm-up is the bigger win.
+_BROADCAST_SIZE = 2 ** 16
+
+# Vertex-edge pairs per thread before the parallel kernel pays
+# for its extra JIT time and per-thread STAT/BNDS buffers, and
+# a cap on the threads used, so that these buffers stay small.
+_PARALLEL_WORK = 2 ** 22
+_PARALLEL_MAX = 8
+
+
+def inpoly(vert, node, edge=None, ftol=5.0e-14, dtype=np.float64):
     """
       INPOLY2: compute "points-in-polygon" queries.
 
@@ -29,6 +47,12 @@ def inpoly(vert, node, edge=None, ftol=5.0e-14):
       point tolerance for boundary comparisons. By default,
       FTOL ~ EPS ^ 0.85.
 
+      STAT, BNDS = INPOLY2(..., DTYPE) sets the floating-point
+      type used for the crossing-number test. DTYPE=FLOAT32 ha-
+      lves the memory footprint of VERT and NODE, but points
+      within ~EPS(FLOAT32) of the polygon may be misclassified.
+      The default is FLOAT64.
+
       --------------------------------------------------------
 
       This algorithm is based on a "crossing-number" test,
@@ -56,165 +80,316 @@ def inpoly(vert, node, edge=None, ftol=5.0e-14):
       of calls to the (relatively) expensive edge intersection
       test.
 
+    * For small problems, where N*M is modest, the sort and the
+      binary-searches are skipped altogether and all point-edge
+      pairs are tested at once via array broadcasting.
+
       Updated: 23 September, 2020
 
       Authors: Darren Engwirda, Keith Roberts
 
     """
 
-    vert = np.asarray(vert)
-    node = np.asarray(node)
+    return _PolygonIndex(node, edge, dtype).query(vert, ftol)
+
+
+class _PolygonIndex:
+    """
+    _POLYGONINDEX: the polygon NODE, EDGE pre-processed for
+    repeated INPOLY queries. The NODE bbox and the per-edge
+    tables (see _EDGE_TABLE) depend on the polygon only, and
+    are computed once rather than per query. Callers testing
+    many sets of vertices against the same polygon should keep
+    an instance and call QUERY.
+
+    """
+
+    def __init__(self, node, edge=None, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+
+        node = np.asarray(node, dtype=self.dtype)
+
+        if edge is None:
+            # ------------------------------- set edges if not passed
+            indx = np.arange(0, node.shape[0] - 1)
+
+            edge = np.zeros((node.shape[0], 2), dtype=np.int32)
+            edge[:-1, 0] = indx + 0
+            edge[:-1, 1] = indx + 1
+            edge[-1, 0] = node.shape[0] - 1
+
+        else:
+            edge = np.asarray(edge)
+
+        self.node = node
+        self.edge = edge
+
+        self.xmin = np.nanmin(node[:, 0])
+        self.ymin = np.nanmin(node[:, 1])
+        self.xmax = np.nanmax(node[:, 0])
+        self.ymax = np.nanmax(node[:, 1])
+
+        # edge tables for the unflipped/flipped axes, built lazily
+        self._edat = {}
 
-    if edge is None:
-        # ----------------------------------- set edges if not passed
-        indx = np.arange(0, node.shape[0] - 1)
+    def edge_table(self, flip):
+        """The M-by-8 edge table, with the x/y axes swapped if FLIP"""
+        if flip not in self._edat:
+            node = self.node[:, (1, 0)] if flip else self.node
+            edge = self.edge.copy()
 
-        edge = np.zeros((node.shape[0], 2), dtype=np.int32)
-        edge[:-1, 0] = indx + 0
-        edge[:-1, 1] = indx + 1
-        edge[-1, 0] = node.shape[0] - 1
+            swap = node[edge[:, 1], 1] < node[edge[:, 0], 1]
+            temp = edge[swap]
+            edge[swap, :] = temp[:, (1, 0)]
 
-    else:
-        edge = np.asarray(edge)
+            self._edat[flip] = _edge_table(node, edge)
 
-    STAT = np.full(vert.shape[0], False, dtype=np.bool_)
-    BNDS = np.full(vert.shape[0], False, dtype=np.bool_)
+        return self._edat[flip]
 
-    # ----------------------------------- prune points using bbox
-    mask = np.logical_and.reduce(
-        (
-            vert[:, 0] >= np.nanmin(node[:, 0]),
-            vert[:, 1] >= np.nanmin(node[:, 1]),
-            vert[:, 0] <= np.nanmax(node[:, 0]),
-            vert[:, 1] <= np.nanmax(node[:, 1]),
+    def query(self, vert, ftol=5.0e-14):
+        """Returns STAT, BNDS for the vertices VERT, see INPOLY"""
+        dtype = self.dtype
+
+        vert = np.asarray(vert, dtype=dtype)
+
+        ftol = dtype.type(ftol)
+
+        STAT = np.full(vert.shape[0], False, dtype=np.bool_)
+        BNDS = np.full(vert.shape[0], False, dtype=np.bool_)
+
+        # ------------------------------- prune points using bbox
+        mask = np.logical_and.reduce(
+            (
+                vert[:, 0] >= self.xmin,
+                vert[:, 1] >= self.ymin,
+                vert[:, 0] <= self.xmax,
+                vert[:, 1] <= self.ymax,
+            )
         )
+
+        vert = vert[mask, :]
+
+        # -------------- flip to ensure y-axis is the `long` axis
+        vmin = np.amin(vert, axis=0)
+        vmax = np.amax(vert, axis=0)
+        ddxy = vmax - vmin
+
+        lbar = np.sum(ddxy) / dtype.type(2.0)
+
+        flip = bool(ddxy[0] > ddxy[1])
+        if flip:
+            vert = vert[:, (1, 0)]
+
+        edat = self.edge_table(flip)
+
+        if vert.shape[0] * edat.shape[0] <= _BROADCAST_SIZE:
+            # --------------------------- small: skip the y-sort
+            stat, bnds = _inpoly_broadcast(vert, edat, ftol, lbar)
+
+        else:
+            # --------------------------- sort points via y-value
+            ivec = np.argsort(vert[:, 1])
+            vert = np.take(vert, ivec, axis=0)
+
+            # --------------------------- call crossing-no kernel
+            nchunk = _num_chunks(vert, edat, ftol, lbar)
+
+            if nchunk > 1:
+                stat, bnds = _inpoly(vert, ivec, edat, ftol, lbar, nchunk)
+            elif _inpoly_cpp is not None and dtype == np.float64:
+                # ----------------------- serial: skip JIT warm-up
+                stat, bnds = _inpoly_cpp(vert, ivec, edat, ftol, lbar)
+            else:
+                stat, bnds = _inpoly_serial(vert, ivec, edat, ftol, lbar, 1)
+
+        STAT[mask] = stat
+        BNDS[mask] = bnds
+
+        return STAT, BNDS
+
+
+def _num_chunks(vert, edat, ftol, lbar):
+    """
+    _NUM_CHUNKS: the number of parallel runs for _INPOLY. The
+    total work is the number of vertex-edge pairs within each
+    edge y-range; one run per _PARALLEL_WORK pairs, capped by
+    the thread count and _PARALLEL_MAX. VERT is sorted by y.
+
+    """
+
+    veps = ftol * lbar
+
+    ione = np.searchsorted(vert[:, 1], edat[:, 2] - veps, "left")
+    itwo = np.searchsorted(vert[:, 1], edat[:, 3] + veps, "right")
+
+    work = int(np.sum(itwo - ione))
+
+    nchunk = min(
+        get_num_threads(), _PARALLEL_MAX, work // _PARALLEL_WORK, edat.shape[0]
     )
 
-    vert = vert[mask, :]
+    return max(nchunk, 1)
 
-    # ------------------ flip to ensure y-axis is the `long` axis
-    vmin = np.amin(vert, axis=0)
-    vmax = np.amax(vert, axis=0)
-    ddxy = vmax - vmin
 
-    lbar = np.sum(ddxy) / 2.0
+def _edge_table(node, edge):
+    """
+    _EDGE_TABLE: pack the per-edge scalars used by the kernels
+    into one M-by-8 array, so that each edge is read from one
+    contiguous row. Columns are XONE, XTWO, YONE, YTWO, XMIN,
+    XMAX, XDEL, YDEL, where EDGE is oriented so YONE <= YTWO.
+    XTWO is not read by any kernel; it is kept only so that
+    rows stay 8 wide, a layout the C++ kernel relies on.
 
-    if ddxy[0] > ddxy[1]:
-        vert = vert[:, (1, 0)]
-        node = node[:, (1, 0)]
+    """
 
-    # ----------------------------------- sort points via y-value
-    swap = node[edge[:, 1], 1] < node[edge[:, 0], 1]
-    temp = edge[swap]
-    edge[swap, :] = temp[:, (1, 0)]
+    edat = np.empty((edge.shape[0], 8), dtype=node.dtype)
 
-    ivec = np.argsort(vert[:, 1])
-    vert = vert[ivec]
+    edat[:, 0] = node[edge[:, 0], 0]
+    edat[:, 1] = node[edge[:, 1], 0]
+    edat[:, 2] = node[edge[:, 0], 1]
+    edat[:, 3] = node[edge[:, 1], 1]
 
-    # ----------------------------------- call crossing-no kernel
-    stmp, btmp = _inpoly(vert, node, edge, ftol, lbar)
+    edat[:, 4] = np.minimum(edat[:, 0], edat[:, 1])
+    edat[:, 5] = np.maximum(edat[:, 0], edat[:, 1])
 
-    # ----------------------------------- unpack array reindexing
-    stat = np.full(vert.shape[0], False, dtype=np.bool_)
-    bnds = np.full(vert.shape[0], False, dtype=np.bool_)
+    edat[:, 6] = edat[:, 1] - edat[:, 0]
+    edat[:, 7] = edat[:, 3] - edat[:, 2]
 
-    stat[ivec] = stmp
-    bnds[ivec] = btmp
+    return edat
 
-    STAT[mask] = stat
-    BNDS[mask] = bnds
 
-    return STAT, BNDS
+def _inpoly_broadcast(vert, edat, ftol, lbar):
+    """
+    _INPOLY_BROADCAST: a loop-free version of the crossing-
+    number test for small problems. Each vertex is tested
+    against every edge as an M-by-N array, and the crossing
+    number is reduced along the edge axis. No sort required.
+
+    """
+
+    feps = ftol * (lbar ** +2)
+    veps = ftol * (lbar ** +1)
+
+    # ----------------------------------- unpack edge bbox/deltas
+    XONE, _, YONE, YTWO, XMIN, XMAX, XDEL, YDEL = edat.T[:, :, None]
+
+    XMAX = XMAX + veps
+    YMIN = YONE - veps
+    YMAX = YTWO + veps
+
+    xpos = vert[:, 0]
+    ypos = vert[:, 1]
+
+    # ----------------------------------- all-pairs crossing test
+    mul1 = YDEL * (xpos - XONE)
+    mul2 = XDEL * (ypos - YONE)
+
+    inbox = (xpos >= XMIN) & (xpos <= XMAX) & (ypos >= YMIN) & (ypos <= YMAX)
+    onedge = inbox & (np.abs(mul2 - mul1) <= feps)
+
+    cross = (ypos >= YONE) & (ypos < YTWO)
+    cross &= (xpos < XMIN) | (inbox & (mul1 < mul2))
+
+    # ----------------------------------- BNDS points are "inside"
+    bnds = np.any(onedge, axis=0)
+    stat = np.logical_xor.reduce(cross, axis=0) | bnds
+
+    return stat, bnds
 
 
-@jit(nopython=True)
-def _inpoly(vert, node, edge, ftol, lbar):
+@jit(nopython=True, parallel=True)
+def _inpoly(vert, ivec, edat, ftol, lbar, nchunk):
     """
     _INPOLY: the local pycode version of the crossing-number
     test. Loop over edges; do a binary-search for the first
     vertex that intersects with the edge y-range; crossing-
     number comparisons; break when the local y-range is met.
+    The per-vertex tests are evaluated as fused boolean masks
+    with no branches at all, so that the inner loop over the
+    contiguous y-range is free to vectorise.
+
+    Edges are split into NCHUNK runs of roughly equal work,
+    processed in parallel into per-run STAT/BNDS buffers that
+    are then reduced: BNDS via OR, STAT via XOR. VERT is sor-
+    ted by y-value via IVEC; STAT and BNDS are returned in the
+    unsorted order.
 
     """
 
     feps = ftol * (lbar ** +2)
     veps = ftol * (lbar ** +1)
 
-    stat = np.full(vert.shape[0], False, dtype=np.bool_)
-    bnds = np.full(vert.shape[0], False, dtype=np.bool_)
+    stat = np.full((nchunk, vert.shape[0]), False, dtype=np.bool_)
+    bnds = np.full((nchunk, vert.shape[0]), False, dtype=np.bool_)
 
     # ----------------------------------- compute y-range overlap
-    XONE = node[edge[:, 0], 0]
-    XTWO = node[edge[:, 1], 0]
-    YONE = node[edge[:, 0], 1]
-    YTWO = node[edge[:, 1], 1]
-
-    XMIN = np.minimum(XONE, XTWO)
-    XMAX = np.maximum(XONE, XTWO)
+    ione = np.searchsorted(vert[:, 1], edat[:, 2] - veps, "left")
+    itwo = np.searchsorted(vert[:, 1], edat[:, 3] + veps, "right")
 
-    XMAX = XMAX + veps
-    YMIN = YONE - veps
-    YMAX = YTWO + veps
+    # ----------------------------------- balance edges over runs
+    work = np.cumsum(itwo - ione)
+    cuts = np.searchsorted(work, work[-1] * np.arange(nchunk + 1) / nchunk)
+    cuts[0] = 0
+    cuts[nchunk] = edat.shape[0]
 
-    YDEL = YTWO - YONE
-    XDEL = XTWO - XONE
+    # ----------------------------------- loop over polygon edges
+    for ichunk in prange(nchunk):
+        for epos in range(cuts[ichunk], cuts[ichunk + 1]):
 
-    ione = np.searchsorted(vert[:, 1], YMIN, "left")
-    itwo = np.searchsorted(vert[:, 1], YMAX, "right")
+            xone = edat[epos, 0]
+            yone = edat[epos, 2]
+            ytwo = edat[epos, 3]
 
-    # ----------------------------------- loop over polygon edges
-    for epos in range(edge.shape[0]):
+            xmin = edat[epos, 4]
+            xmax = edat[epos, 5] + veps
 
-        xone = XONE[epos]
-        xtwo = XTWO[epos]
-        yone = YONE[epos]
-        ytwo = YTWO[epos]
+            xdel = edat[epos, 6]
+            ydel = edat[epos, 7]
 
-        xmin = XMIN[epos]
-        xmax = XMAX[epos]
+            # --------------------------- calc. edge-intersection
+            for jpos in range(ione[epos], itwo[epos]):
 
-        xdel = XDEL[epos]
-        ydel = YDEL[epos]
+                xpos = vert[jpos, 0]
+                ypos = vert[jpos, 1]
 
-        # ------------------------------- calc. edge-intersection
-        for jpos in range(ione[epos], itwo[epos]):
+                # ----------------------- compute crossing number
+                mul1 = ydel * (xpos - xone)
+                mul2 = xdel * (ypos - yone)
 
-            if bnds[jpos]:
-                continue
+                # BNDS -- approx. on edge. This also covers exact
+                # matches about ONE and TWO, where MUL1 == MUL2.
+                inbox = (xpos >= xmin) & (xpos <= xmax)
+                onedge = inbox & (np.abs(mul2 - mul1) <= feps)
 
-            xpos = vert[jpos, 0]
-            ypos = vert[jpos, 1]
+                # advance crossing number -- to the left of the
+                # edge bbox, or a strict crossing within it. BNDS
+                # points are forced "inside" after the reduction,
+                # so their crossings need not be masked here.
+                cross = (ypos >= yone) & (ypos < ytwo)
+                cross &= (xpos < xmin) | (inbox & (mul1 < mul2))
 
-            if xpos >= xmin:
-                if xpos <= xmax:
-                    # ------------------- compute crossing number
-                    mul1 = ydel * (xpos - xone)
-                    mul2 = xdel * (ypos - yone)
+                stat[ichunk, jpos] ^= cross
+                bnds[ichunk, jpos] |= onedge
 
-                    if feps >= np.abs(mul2 - mul1):
-                        # ------------------- BNDS -- approx. on edge
-                        bnds[jpos] = True
-                        stat[jpos] = True
+    # ----------------------------------- reduce + unpack reindex
+    STAT = np.empty(vert.shape[0], dtype=np.bool_)
+    BNDS = np.empty(vert.shape[0], dtype=np.bool_)
 
-                    elif (ypos == yone) and (xpos == xone):
-                        # ------------------- BNDS -- match about ONE
-                        bnds[jpos] = True
-                        stat[jpos] = True
+    for jpos in prange(vert.shape[0]):
+        sval = False
+        bval = False
+        for ichunk in range(nchunk):
+            sval ^= stat[ichunk, jpos]
+            bval |= bnds[ichunk, jpos]
 
-                    elif (ypos == ytwo) and (xpos == xtwo):
-                        # ------------------- BNDS -- match about TWO
-                        bnds[jpos] = True
-                        stat[jpos] = True
+        STAT[ivec[jpos]] = sval | bval
+        BNDS[ivec[jpos]] = bval
 
-                    elif (mul1 < mul2) and (ypos >= yone) and (ypos < ytwo):
-                        # ------------------- advance crossing number
-                        stat[jpos] = not stat[jpos]
+    return STAT, BNDS
 
-            elif (ypos >= yone) and (ypos < ytwo):
-                # ----------------------- advance crossing number
-                stat[jpos] = not stat[jpos]
 
-    return stat, bnds
+# single-thread build of _INPOLY, for when NCHUNK == 1
+_inpoly_serial = jit(nopython=True)(_inpoly.py_func)
 
 
 # def inpoly(vert, node, edge=None, ftol=4.9485e-16):
@@ -2,7 +2,7 @@ import numpy
 import scipy.spatial
 
 from . import edges
-from .inpoly import inpoly
+from .inpoly import _PolygonIndex
 
 __all__ = ["signed_distance_function", "Domain"]
 
@@ -42,13 +42,17 @@ def signed_distance_function(shoreline):
     boubox = _create_boubox(shoreline.bbox)
     e_box = edges.get_poly_edges(boubox)
 
+    # pre-process both polygons once for the repeated queries below
+    poly_index = _PolygonIndex(poly, e)
+    boubox_index = _PolygonIndex(boubox, e_box)
+
     def func(x):
         # Initialize d with some positive number larger than geps
         dist = numpy.zeros(len(x)) + 1.0
         # are points inside the boubox?
-        in_boubox, _ = inpoly(x, boubox, e_box)
+        in_boubox, _ = boubox_index.query(x)
         # are points inside the shoreline?
-        in_shoreline, _ = inpoly(x, poly, e)
+        in_shoreline, _ = poly_index.query(x)
         # compute dist to shoreline
         d, _ = tree.query(x, k=1)
         # d is signed negative if inside the
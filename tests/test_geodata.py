@@ -1,8 +1,10 @@
 import os
 
+import numpy as np
 import pytest
 
 from oceanmesh import DEM, Shoreline, edges
+from oceanmesh.geodata import _poly_area
 
 fname = os.path.join(os.path.dirname(__file__), "GSHHS_l_L1.shp")
 dfname = os.path.join(os.path.dirname(__file__), "galv_sub.nc")
@@ -45,3 +47,17 @@ def test_geodata(files_bboxes):
     f, bbox = files_bboxes
     dem = DEM(f, bbox)
     assert isinstance(dem, DEM), "DEM class did not form"
+
+
+def test_poly_area():
+    """Areas of a stack of polygons match the area of each row"""
+    rng = np.random.default_rng(0)
+    theta = np.sort(rng.uniform(0.0, 2.0 * np.pi, (5, 12)), axis=1)
+    x = 1.5 * np.cos(theta) + rng.uniform(-1.0, 1.0, (5, 1))
+    y = 0.5 * np.sin(theta) + rng.uniform(-1.0, 1.0, (5, 1))
+
+    area = _poly_area(x, y)
+
+    assert area.shape == (5,)
+    assert np.allclose(area, [_poly_area(xi, yi) for xi, yi in zip(x, y)])
+    assert np.isclose(_poly_area(np.array([0, 1, 1, 0]), np.array([0, 0, 1, 1])), 1.0)
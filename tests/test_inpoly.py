@@ -0,0 +1,74 @@
+import importlib
+
+import numpy as np
+import pytest
+
+from oceanmesh import inpoly
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("kernel", ["broadcast", "cpp", "serial", "parallel"])
+def test_inpoly(monkeypatch, kernel, dtype):
+    """Square with a square hole, queried via each kernel, in
+    double and single precision"""
+    module = importlib.import_module("oceanmesh.inpoly")
+
+    if kernel == "cpp" and (module._inpoly_cpp is None or dtype != np.float64):
+        pytest.skip("C++ kernel not built, or not float64")
+
+    if kernel != "broadcast":
+        monkeypatch.setattr(module, "_BROADCAST_SIZE", 0)
+    if kernel in ("serial", "parallel"):
+        monkeypatch.setattr(module, "_inpoly_cpp", None)
+    if kernel == "parallel":
+        monkeypatch.setattr(module, "get_num_threads", lambda: 4)
+        monkeypatch.setattr(module, "_PARALLEL_WORK", 1)
+
+    node = np.array(
+        [
+            [0.0, 0.0],
+            [4.0, 0.0],
+            [4.0, 4.0],
+            [0.0, 4.0],
+            [1.0, 1.0],
+            [3.0, 1.0],
+            [3.0, 3.0],
+            [1.0, 3.0],
+        ]
+    )
+    edge = np.array([[0, 1], [1, 2], [2, 3], [3, 0], [4, 5], [5, 6], [6, 7], [7, 4]])
+    vert = np.array(
+        [
+            [0.5, 0.5],  # inside
+            [2.0, 2.0],  # in the hole
+            [5.0, 2.0],  # outside
+            [2.0, 0.0],  # on the outer boundary
+            [1.0, 2.0],  # on the inner boundary
+            [4.0, 4.0],  # on a vertex
+        ]
+    )
+
+    stat, bnds = inpoly(vert, node, edge, dtype=dtype)
+
+    assert np.array_equal(stat, [True, False, False, True, True, True])
+    assert np.array_equal(bnds, [False, False, False, True, True, True])
+
+
+def test_polygon_index():
+    """A pre-processed polygon gives the same answer as `inpoly`
+    over repeated queries, for both orientations of the points"""
+    module = importlib.import_module("oceanmesh.inpoly")
+
+    rng = np.random.default_rng(0)
+    theta = np.linspace(0.0, 2.0 * np.pi, 64, endpoint=False)
+    node = np.column_stack((np.cos(theta), 0.5 * np.sin(theta)))
+
+    index = module._PolygonIndex(node)
+    for scale in ([1.0, 0.5], [0.5, 1.0], [1.0, 0.5]):
+        vert = rng.uniform(-1.0, 1.0, (2000, 2)) * scale
+
+        stat, bnds = index.query(vert)
+        stat_, bnds_ = inpoly(vert, node)
+
+        assert np.array_equal(stat, stat_)
+        assert np.array_equal(bnds, bnds_)